@@ -17,7 +17,9 @@ class SaucedemoBot(Base):
             proxy: str | None = None,
             use_headless: bool = False,
             final_screenshot_required: bool = False,
-            timeout: float = 10
+            timeout: float = 10,
+            metrics_mode: str | None = None,
+            har_required: bool = False
         ):
         """
         Основной класс бота для сайта saucedemo.com
@@ -28,12 +30,16 @@ class SaucedemoBot(Base):
         :param use_headless: Запуск без UI
         :param final_screenshot_required: Делать ли финальный скриншот
         :param timeout: Таймаут ожидания элементов
+        :param metrics_mode: Сбор метрик страницы после шагов: None, 'light' или 'full'
+        :param har_required: Сохранять ли сетевые события в HAR (только вместе с metrics_mode)
         """
         super().__init__(
             proxy=proxy,
             use_headless=use_headless,
             final_screenshot_required=final_screenshot_required,
-            timeout=timeout
+            timeout=timeout,
+            metrics_mode=metrics_mode,
+            har_required=har_required
         )
         usernames = usernames if usernames else [
             "standard_user", "locked_out_user", "problem_user",
@@ -47,12 +53,19 @@ class SaucedemoBot(Base):
             self._check_proxy()
         for username in self.usernames:
             self.username = username
-            success = self._login()
+            if self.metrics:
+                self.metrics.start_user()
+            success = self._run_step(self.username, "login", self._login)
 
             if success:
                 self._perform_post_login_actions()
             elif self.final_screenshot_required:
                 self._save_screenshot("login_error")
+
+            if self.metrics:
+                self.metrics.log_summary(self.username)
+        if self.metrics:
+            self.metrics.export(self.log.session_starttime)
         self.log.log_time("Общее время выполнения бота: ")
         self.driver.quit()
 
@@ -115,15 +128,15 @@ class SaucedemoBot(Base):
     def _perform_post_login_actions(self):
         """Последовательное выполнение всех этапов пользовательского взаимодействия после входа"""
         self.log.log_info("Производим имитацию пользователя на сайте.")
-        self._apply_product_sorting()
-        self._reset_application_state()
-        self._open_cart_and_continue()
-        self._click_each_product()
-        self._process_cart_and_checkout()
-        if self._fill_and_submit_order_form():
-            if self._complete_checkout_step_two():
-                self._complete_checkout_confirmation()
-        self._perform_logout()
+        self._run_step(self.username, "product_sorting", self._apply_product_sorting)
+        self._run_step(self.username, "reset_app_state", self._reset_application_state)
+        self._run_step(self.username, "open_cart", self._open_cart_and_continue)
+        self._run_step(self.username, "add_products", self._click_each_product)
+        self._run_step(self.username, "cart_checkout", self._process_cart_and_checkout)
+        if self._run_step(self.username, "order_form", self._fill_and_submit_order_form):
+            if self._run_step(self.username, "checkout_step_two", self._complete_checkout_step_two):
+                self._run_step(self.username, "checkout_complete", self._complete_checkout_confirmation)
+        self._run_step(self.username, "logout", self._perform_logout)
 
     def _apply_product_sorting(self):
         """Случайным образом применяет одну из сортировок товаров."""
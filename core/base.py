@@ -6,13 +6,26 @@ from pathlib import Path
 import time
 import random
 from core.logger import Log
+from core.metrics import PageMetrics
 
 
 class Base:
-    def __init__(self, proxy: str | None, use_headless: bool, final_screenshot_required: bool, timeout: float):
+    def __init__(
+            self,
+            proxy: str | None,
+            use_headless: bool,
+            final_screenshot_required: bool,
+            timeout: float,
+            metrics_mode: str | None = None,
+            har_required: bool = False
+        ):
         """
-        Базовый класс для всех ботов. Создаёт директории, инициализирует логгер и драйвер.
+        Базовый класс для всех ботов. Создаёт директории, инициализирует логгер, драйвер
+        и, если задан metrics_mode, сборщик метрик производительности страницы.
         """
+        if metrics_mode and metrics_mode not in PageMetrics.MODES:
+            raise ValueError(f"Неизвестный режим метрик: {metrics_mode}")
+
         self.PROJECT_ROOT = Path(__file__).resolve().parent.parent
         self.screenshot_path = self.PROJECT_ROOT / 'screenshots'
         self.screenshot_path.mkdir(parents=True, exist_ok=True)
@@ -24,8 +37,27 @@ class Base:
         self.use_headless = use_headless
         self.final_screenshot_required = final_screenshot_required
         self.timeout = 2 * timeout if self.proxy else timeout
+        self.har_required = bool(metrics_mode) and har_required
+        if har_required and not metrics_mode:
+            self.log.log_warning("HAR не будет сохранён: har_required работает только вместе с metrics_mode.")
         self.driver = self._init_driver()
 
+        self.metrics = None
+        if metrics_mode:
+            try:
+                self.metrics = PageMetrics(
+                    driver=self.driver,
+                    log=self.log,
+                    output_path=self.PROJECT_ROOT / 'metrics',
+                    class_name=class_name,
+                    mode=metrics_mode,
+                    har_required=self.har_required
+                )
+            except Exception:
+                # Не оставляем запущенный браузер, если сборщик метрик не поднялся
+                self.driver.quit()
+                raise
+
     def _init_driver(self):
         """
         Инициализирует undetected_chromedriver с заданными опциями.
@@ -48,6 +80,10 @@ class Base:
                 self.proxy = f"http://{self.proxy}"
             options.add_argument(f'--proxy-server={self.proxy}')
 
+        # Сетевые события для HAR пишутся в лог производительности Chrome
+        if self.har_required:
+            options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
         driver = uc.Chrome(options=options)
         
         if not self.use_headless:
@@ -55,6 +91,24 @@ class Base:
 
         return driver
 
+    def _run_step(self, username: str, step: str, action):
+        """
+        Выполняет шаг сценария и, если включены метрики, снимает их сразу после шага.
+        Возвращает результат шага.
+
+        :param username: Пользователь, к которому относится замер
+        :param step: Имя шага
+        :param action: Метод шага без аргументов
+        """
+        if not self.metrics:
+            return action()
+
+        start_time = time.perf_counter()
+        try:
+            return action()
+        finally:
+            self.metrics.sample(username, step, time.perf_counter() - start_time)
+
     def _wait_random_delay(self, min: float = 1, max: float = 3):
         """Случайная задержка между действиями, имитирует поведение человека."""
         delay = random.uniform(min, max)
@@ -0,0 +1,374 @@
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from core.logger import Log
+
+
+class PageMetrics:
+    MODES = ("light", "full")
+
+    # Один вызов execute_script на шаг: Navigation Timing, новые Resource Timing
+    # записи (буфер сразу очищается, чтобы следующий шаг видел только свои ресурсы).
+    SAMPLE_SCRIPT = """
+        const nav = performance.getEntriesByType('navigation')[0];
+        const resources = performance.getEntriesByType('resource').map(r => ({
+            name: r.name,
+            initiatorType: r.initiatorType,
+            startTime: r.startTime,
+            requestStart: r.requestStart,
+            responseStart: r.responseStart,
+            responseEnd: r.responseEnd,
+            duration: r.duration,
+            transferSize: r.transferSize
+        }));
+        performance.clearResourceTimings();
+        return {
+            url: location.href,
+            timeOrigin: performance.timeOrigin,
+            now: performance.now(),
+            navigation: nav ? nav.toJSON() : null,
+            resources: resources
+        };
+    """
+
+    # Исходная точка перед сценарием пользователя: сбрасывает буфер ресурсов и возвращает текущий документ
+    BASELINE_SCRIPT = """
+        performance.clearResourceTimings();
+        return performance.timeOrigin;
+    """
+
+    # Накопительные CDP-метрики (секунды с начала документа), для которых считается прирост за шаг
+    CDP_COUNTERS = ("TaskDuration", "ScriptDuration", "LayoutDuration", "RecalcStyleDuration")
+    # Мгновенные CDP-метрики, которые записываются текущим значением
+    CDP_GAUGES = ("JSHeapUsedSize", "Nodes")
+
+    def __init__(self, driver, log: Log, output_path: Path, class_name: str, mode: str = "light", har_required: bool = False):
+        """
+        Сбор метрик производительности страницы по шагам бота.
+
+        :param driver: Экземпляр WebDriver
+        :param log: Логгер бота
+        :param output_path: Директория для JSON-отчёта и HAR-файлов
+        :param class_name: Имя класса бота (для имён файлов)
+        :param mode: 'light' — только Navigation/Resource Timing одним вызовом,
+                     'full' — дополнительно CDP Performance.getMetrics
+        :param har_required: Сохранять ли сетевые события в HAR
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Неизвестный режим метрик: {mode}")
+
+        self.driver = driver
+        self.log = log
+        self.output_path = output_path
+        self.output_path.mkdir(parents=True, exist_ok=True)
+        self.class_name = class_name.lower()
+        self.mode = mode
+        self.har_required = har_required
+
+        self.samples = {}
+        self.network_events = {}
+        self._last_time_origin = None
+        self._document_origin = None
+        self._last_cdp = {}
+
+        if self.mode == "full":
+            self.driver.execute_cdp_cmd("Performance.enable", {"timeDomain": "timeTicks"})
+
+    def start_user(self):
+        """
+        Снимает исходные значения перед сценарием пользователя, чтобы его первый шаг
+        не включал время предыдущих страниц (проверка прокси, прошлый пользователь).
+        """
+        try:
+            self._document_origin = self.driver.execute_script(self.BASELINE_SCRIPT)
+            # Загрузка текущего документа была до сценария — к шагам её не относим
+            self._last_time_origin = self._document_origin
+            self._last_cdp = {}
+            if self.mode == "full":
+                self._cdp_delta()
+            if self.har_required:
+                # Сетевые события до сценария (проверка прокси, прошлый пользователь) в HAR не попадают
+                self.driver.get_log("performance")
+        except Exception as e:
+            self.log.log_warning(f"[METRICS] Не удалось снять исходные метрики: {e}")
+
+    def sample(self, username: str, step: str, duration: float):
+        """
+        Снимает метрики после шага и сохраняет их под пользователем и шагом.
+        Ошибки сбора только логируются — метрики не должны ломать сценарий.
+
+        :param username: Текущий пользователь
+        :param step: Имя шага
+        :param duration: Время выполнения шага ботом (секунды)
+        """
+        try:
+            raw = self.driver.execute_script(self.SAMPLE_SCRIPT)
+            # Новый документ — накопительные CDP-счётчики начались с нуля
+            if raw.get("timeOrigin") != self._document_origin:
+                self._document_origin = raw.get("timeOrigin")
+                self._last_cdp = {}
+            cdp = self._cdp_delta() if self.mode == "full" else None
+            record = self._build_record(step, duration, raw, cdp)
+
+            if self.har_required:
+                self.network_events.setdefault(username, []).extend(self.driver.get_log("performance"))
+
+            self.samples.setdefault(username, {}).setdefault(step, []).append(record)
+        except Exception as e:
+            self.log.log_warning(f"[METRICS] Не удалось снять метрики шага {step}: {e}")
+
+    def _build_record(self, step: str, duration: float, raw: dict, cdp: dict | None = None) -> dict:
+        """
+        Приводит сырые тайминги к записи шага.
+        page_ms — время шага, когда страница была занята: окно загрузки документа [0, loadEventEnd]
+        плюс объединение интервалов загрузки ресурсов вне этого окна, всё в пределах окна шага.
+        bot_overhead_ms — остаток времени шага: задержки, клики, ожидания бота.
+        task_ms (режим 'full') — прирост TaskDuration за шаг. Когда именно шли задачи главного
+        потока, CDP не сообщает, они могут перекрываться с загрузкой, поэтому в page_ms не входят.
+        """
+        duration_ms = duration * 1000
+        record = {
+            "step": step,
+            "url": raw.get("url"),
+            "duration_ms": round(duration_ms, 1),
+            "ttfb_ms": None,
+            "dom_content_loaded_ms": None,
+            "load_ms": None,
+        }
+
+        nav = raw.get("navigation")
+        # В SPA navigation-запись одна на документ — учитываем её один раз, на первом шаге
+        # после окончания загрузки (до этого loadEventEnd равен 0 и тайминги ещё не готовы)
+        if nav and nav["loadEventEnd"] > 0 and raw.get("timeOrigin") != self._last_time_origin:
+            self._last_time_origin = raw.get("timeOrigin")
+            record["ttfb_ms"] = round(nav["responseStart"] - nav["requestStart"], 1)
+            record["dom_content_loaded_ms"] = round(nav["domContentLoadedEventEnd"] - nav["startTime"], 1)
+            record["load_ms"] = round(nav["loadEventEnd"] - nav["startTime"], 1)
+
+        resources = raw.get("resources") or []
+        # requestStart/responseStart равны 0 для кросс-доменных ресурсов без Timing-Allow-Origin
+        server_times = [r["responseStart"] - r["requestStart"] for r in resources if r["requestStart"] > 0]
+        load_end = nav["loadEventEnd"] if record["load_ms"] is not None else 0
+        # Окно шага во времени страницы: всё, что было до его начала, к шагу не относится
+        step_start = max(raw["now"] - duration_ms, 0)
+        load_busy = max(load_end - step_start, 0)
+        resource_busy = self._busy_time(
+            [(r["startTime"], r["responseEnd"]) for r in resources], max(load_end, step_start))
+
+        record["resource_count"] = len(resources)
+        record["resource_server_ms"] = round(max(server_times), 1) if server_times else None
+        record["resource_busy_ms"] = round(resource_busy, 1)
+        record["transfer_bytes"] = sum(r["transferSize"] for r in resources)
+
+        if cdp is not None:
+            record["task_ms"] = round(cdp.get("TaskDuration", 0) * 1000, 1)
+            record["cdp"] = cdp
+
+        page_ms = load_busy + resource_busy
+        record["page_ms"] = round(page_ms, 1)
+        record["bot_overhead_ms"] = round(duration_ms - page_ms, 1)
+        return record
+
+    @staticmethod
+    def _busy_time(intervals: list, lower_bound: float) -> float:
+        """
+        Суммирует объединение интервалов загрузки ресурсов без части до lower_bound
+        (окно загрузки документа или начало шага). Простои между запросами в сумму не попадают.
+        """
+        busy, current_start, current_end = 0, None, None
+        for start, end in sorted((max(start, lower_bound), end) for start, end in intervals if end > lower_bound):
+            if current_end is None or start > current_end:
+                if current_end is not None:
+                    busy += current_end - current_start
+                current_start, current_end = start, end
+            else:
+                current_end = max(current_end, end)
+        if current_end is not None:
+            busy += current_end - current_start
+        return busy
+
+    def _cdp_delta(self) -> dict:
+        """
+        Снимает Performance.getMetrics: для накопительных метрик возвращает прирост с прошлого шага,
+        для мгновенных — текущее значение. При смене документа sample() очищает _last_cdp,
+        и прирост считается от нуля.
+        """
+        metrics = self.driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+        values = {m["name"]: m["value"] for m in metrics}
+
+        delta = {}
+        current = {name: values[name] for name in self.CDP_COUNTERS if name in values}
+        for name, value in current.items():
+            previous = self._last_cdp.get(name, 0)
+            delta[name] = round(value - previous, 4)
+        self._last_cdp = current
+
+        for name in self.CDP_GAUGES:
+            if name in values:
+                delta[name] = values[name]
+        return delta
+
+    def summary(self) -> dict:
+        """Агрегирует записи по пользователю и шагу: количество замеров и средние значения."""
+        summary = {}
+        for username, steps in self.samples.items():
+            summary[username] = {}
+            for step, records in steps.items():
+                aggregated = {"samples": len(records)}
+                for key, value in records[0].items():
+                    if key in ("step", "url"):
+                        continue
+                    if key == "cdp":
+                        aggregated["cdp"] = {
+                            name: round(sum(r["cdp"].get(name, 0) for r in records) / len(records), 4)
+                            for name in value
+                        }
+                        continue
+                    values = [r[key] for r in records if r[key] is not None]
+                    aggregated[key] = round(sum(values) / len(values), 1) if values else None
+                summary[username][step] = aggregated
+        return summary
+
+    def log_summary(self, username: str):
+        """Выводит в лог сводку по шагам пользователя."""
+        for step, data in self.summary().get(username, {}).items():
+            ttfb = f"{data['ttfb_ms']} мс" if data["ttfb_ms"] is not None else "—"
+            task = f", задачи JS {data['task_ms']} мс" if data.get("task_ms") is not None else ""
+            self.log.log_message(
+                f"[METRICS] {username} / {step}: шаг {data['duration_ms']} мс, "
+                f"страница {data['page_ms']} мс, TTFB {ttfb}, бот {data['bot_overhead_ms']} мс{task}"
+            )
+
+    def export(self, session_starttime: datetime):
+        """Сохраняет сырые замеры и агрегаты в JSON, а при необходимости — HAR по каждому пользователю."""
+        timestamp = session_starttime.strftime("%Y_%m_%d_%H_%M_%S")
+        report_path = self.output_path / f"{self.class_name}_metrics_{timestamp}.json"
+        with open(report_path, 'w', encoding='utf-8') as report_file:
+            json.dump({"mode": self.mode, "summary": self.summary(), "samples": self.samples},
+                      report_file, ensure_ascii=False, indent=2)
+        self.log.log_info(f"Метрики сохранены:\n{report_path}")
+
+        if not self.har_required:
+            return
+
+        for username, events in self.network_events.items():
+            har_path = self.output_path / f"{self.class_name}_{username.lower()}_{timestamp}.har"
+            with open(har_path, 'w', encoding='utf-8') as har_file:
+                json.dump(self._build_har(events), har_file, ensure_ascii=False, indent=2)
+            self.log.log_info(f"HAR сохранён:\n{har_path}")
+
+    def _build_har(self, events: list) -> dict:
+        """
+        Собирает HAR 1.2 из событий Network.* лога производительности Chrome.
+        Каждый редирект — отдельная запись (в CDP у всех шагов редиректа один requestId),
+        незавершённые и упавшие запросы в HAR не попадают.
+        """
+        pending, hops = {}, []
+        for event in events:
+            message = json.loads(event["message"])["message"]
+            method, params = message.get("method"), message.get("params", {})
+            request_id = params.get("requestId")
+
+            if method == "Network.requestWillBeSent":
+                redirect = params.get("redirectResponse")
+                if redirect and request_id in pending:
+                    hops.append({
+                        **pending[request_id],
+                        "response": redirect,
+                        "end": params["timestamp"],
+                        "size": int(redirect.get("encodedDataLength", 0)),
+                        "redirect_url": params["request"]["url"],
+                    })
+                pending[request_id] = {"sent": params, "response": None}
+            elif method == "Network.responseReceived" and request_id in pending:
+                pending[request_id]["response"] = params["response"]
+            elif method == "Network.loadingFinished" and pending.get(request_id, {}).get("response"):
+                hops.append({
+                    **pending.pop(request_id),
+                    "end": params["timestamp"],
+                    "size": int(params["encodedDataLength"]),
+                    "redirect_url": "",
+                })
+            elif method == "Network.loadingFailed":
+                pending.pop(request_id, None)
+
+        if pending:
+            self.log.log_info(f"[METRICS] В HAR не попали незавершённые запросы: {len(pending)}")
+
+        entries = []
+        for hop in sorted(hops, key=lambda h: h["sent"]["timestamp"]):
+            sent, response = hop["sent"], hop["response"]
+            request = sent["request"]
+            timings = self._har_timings(response.get("timing"), sent["timestamp"], hop["end"])
+
+            entries.append({
+                "startedDateTime": datetime.fromtimestamp(sent["wallTime"], timezone.utc).isoformat(),
+                # По HAR 1.2 time — сумма фаз timings (ssl уже входит в connect)
+                "time": round(sum(value for name, value in timings.items() if name != "ssl" and value > 0), 3),
+                "request": {
+                    "method": request["method"],
+                    "url": request["url"],
+                    "httpVersion": response.get("protocol", ""),
+                    "headers": self._har_headers(request.get("headers", {})),
+                    "queryString": [],
+                    "cookies": [],
+                    "headersSize": -1,
+                    "bodySize": -1,
+                },
+                "response": {
+                    "status": response.get("status", 0),
+                    "statusText": response.get("statusText", ""),
+                    "httpVersion": response.get("protocol", ""),
+                    "headers": self._har_headers(response.get("headers", {})),
+                    "cookies": [],
+                    "content": {
+                        "size": hop["size"],
+                        "mimeType": response.get("mimeType", ""),
+                    },
+                    "redirectURL": hop["redirect_url"],
+                    "headersSize": -1,
+                    "bodySize": hop["size"],
+                },
+                "cache": {},
+                "timings": timings,
+            })
+
+        return {
+            "log": {
+                "version": "1.2",
+                "creator": {"name": self.class_name, "version": "1.0"},
+                "pages": [],
+                "entries": entries,
+            }
+        }
+
+    @staticmethod
+    def _har_headers(headers: dict) -> list:
+        """Переводит словарь заголовков CDP в список name/value для HAR."""
+        return [{"name": name, "value": str(value)} for name, value in headers.items()]
+
+    @staticmethod
+    def _har_timings(timing: dict | None, sent_timestamp: float, end_timestamp: float) -> dict:
+        """
+        Переводит ResourceTiming из CDP в блок timings HAR.
+        Все фазы CDP отсчитываются в мс от timing.requestTime, от него же считается и receive.
+        """
+        if not timing:
+            # Ответ из кэша или data:-URL — фаз нет, всё время записываем в wait
+            total = round(max((end_timestamp - sent_timestamp) * 1000, 0), 3)
+            return {"blocked": -1, "dns": -1, "connect": -1, "ssl": -1, "send": 0, "wait": total, "receive": 0}
+
+        def span(start: str, end: str) -> float:
+            return round(timing[end] - timing[start], 3) if timing[start] >= 0 else -1
+
+        end_ms = (end_timestamp - timing["requestTime"]) * 1000
+        first_phase = next((timing[name] for name in ("dnsStart", "connectStart", "sendStart") if timing[name] >= 0), 0)
+        return {
+            "blocked": round(first_phase, 3),
+            "dns": span("dnsStart", "dnsEnd"),
+            "connect": span("connectStart", "connectEnd"),
+            "ssl": span("sslStart", "sslEnd"),
+            "send": round(max(timing["sendEnd"] - timing["sendStart"], 0), 3),
+            "wait": round(max(timing["receiveHeadersEnd"] - timing["sendEnd"], 0), 3),
+            "receive": round(max(end_ms - timing["receiveHeadersEnd"], 0), 3),
+        }
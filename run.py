@@ -36,8 +36,22 @@ def parse_args():
         default=10,
         help="Таймаут ожидания элементов (секунды, по умолчанию: 10)"
     )
+    parser.add_argument(
+        "--metrics",
+        choices=["light", "full"],
+        default=None,
+        help="Снимать метрики страницы после каждого шага: light — Navigation/Resource Timing, full — плюс CDP Performance.getMetrics"
+    )
+    parser.add_argument(
+        "--har",
+        action="store_true",
+        help="Сохранять сетевые события в HAR (только вместе с --metrics)"
+    )
 
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.har and not args.metrics:
+        parser.error("--har используется только вместе с --metrics")
+    return args
 
 if __name__ == '__main__':
     args = parse_args()
@@ -48,6 +62,8 @@ if __name__ == '__main__':
         proxy=args.proxy,
         use_headless=args.headless,
         final_screenshot_required=args.screenshot,
-        timeout=args.timeout
+        timeout=args.timeout,
+        metrics_mode=args.metrics,
+        har_required=args.har
     )
     bot.run()
\ No newline at end of file